@@ -72,25 +72,24 @@ def cluster_time_windowed(
     idx_df["sort_time"] = idx_df["resolved_datetime"].fillna(idx_df["fallback_time"])
     idx_df = idx_df.sort_values("sort_time").reset_index(drop=True)
 
-    embed_map = {row["id"]: np.asarray(row["emb"], dtype="float32") for _, row in embeds_df.iterrows()}
+    embed_map = {rid: np.asarray(emb, dtype="float32") for rid, emb in zip(embeds_df["id"], embeds_df["emb"])}
+    embed_get = embed_map.get
 
     results: List[Dict] = []
     cluster_id = 0
-    window_minutes = cfg.time_window_minutes
+    window = pd.Timedelta(minutes=cfg.time_window_minutes)
     current_ids: List[int] = []
     current_embeds: List[np.ndarray] = []
     current_start: pd.Timestamp | None = None
 
-    for _, row in idx_df.iterrows():
-        rid = int(row["id"])
-        emb = embed_map.get(rid)
+    for rid, ts in zip(idx_df["id"].tolist(), idx_df["sort_time"]):
+        rid = int(rid)
+        emb = embed_get(rid)
         if emb is None:
             continue
-        ts = row["sort_time"]
         if current_start is None:
             current_start = ts
-        delta_minutes = (ts - current_start).total_seconds() / 60.0
-        if delta_minutes > window_minutes and current_ids:
+        if ts - current_start > window and current_ids:
             cluster_id = _append_window_clusters(
                 results,
                 cluster_id,
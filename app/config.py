@@ -1,13 +1,45 @@
 from __future__ import annotations
 
-import yaml
+import copy
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
+
+import yaml
+
+# libyaml-backed loader when PyYAML was built with it; same semantics as SafeLoader.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_CACHE_MAX = 32
+_CACHE: "OrderedDict[str, Tuple[Tuple[int, int], Any]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
 
 
 def load_config(path: str | Path) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as fh:
-        return yaml.safe_load(fh)
+    """Load a YAML file, reusing the previous parse while mtime and size match.
+
+    Callers receive a deep copy, so mutating the result never touches the cache.
+    """
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    signature = (st.st_mtime_ns, st.st_size)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(key)
+        if cached is not None and cached[0] == signature:
+            _CACHE.move_to_end(key)
+            return copy.deepcopy(cached[1])
+
+    with open(key, "r", encoding="utf-8") as fh:
+        data = yaml.load(fh, Loader=_YamlLoader)
+
+    with _CACHE_LOCK:
+        _CACHE[key] = (signature, data)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_MAX:
+            _CACHE.popitem(last=False)
+    return copy.deepcopy(data)
 
 
 __all__ = ["load_config"]
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Tuple
 
 import numpy as np
 import torch
@@ -11,24 +13,67 @@ from PIL import Image
 from app.utils import chunked
 
 
+_CLIP_MODELS: Dict[Tuple[str, str, str], tuple] = {}
+_CLIP_LOCK = threading.Lock()
+
+
+def load_clip(model_name: str, pretrained: str, device: str):
+    """Return (model, preprocess, tokenizer), created once per model/weights/device.
+
+    The embedder, CK tagger and AI concept scorer usually ask for the same
+    checkpoint, so they share one copy of the weights. Hits skip the lock; the
+    locked re-check keeps concurrent first calls from loading twice.
+    """
+    key = (model_name, pretrained, device)
+    loaded = _CLIP_MODELS.get(key)
+    if loaded is None:
+        with _CLIP_LOCK:
+            loaded = _CLIP_MODELS.get(key)
+            if loaded is None:
+                model, _, preprocess = open_clip.create_model_and_transforms(
+                    model_name, pretrained=pretrained, device=device
+                )
+                model.eval()
+                loaded = (model, preprocess, open_clip.get_tokenizer(model_name))
+                _CLIP_MODELS[key] = loaded
+    return loaded
+
+
+def release_clip_models() -> None:
+    """Drop the shared CLIP models so their GPU memory can be reclaimed.
+
+    Process-wide: only call once no embedder or tagger in any session still holds
+    a model, otherwise the weights stay resident and the next load duplicates them.
+    Pipeline.close() deliberately leaves this cache alone.
+    """
+    with _CLIP_LOCK:
+        _CLIP_MODELS.clear()
+
+
 class ClipEmbedder:
-    def __init__(self, model_name: str, pretrained: str, device: str = "cuda", batch_size: int = 128):
+    def __init__(
+        self,
+        model_name: str,
+        pretrained: str,
+        device: str = "cuda",
+        batch_size: int = 128,
+        workers: int = 1,
+    ):
         if device == "cuda" and not torch.cuda.is_available():
             device = "cpu"
         self.device = device
         self.batch_size = batch_size
-        self.model, _, self.preprocess = open_clip.create_model_and_transforms(
-            model_name, pretrained=pretrained, device=device
-        )
-        self.model.eval()
-        self.tokenizer = open_clip.get_tokenizer(model_name)
+        self.workers = max(1, workers)
+        self.model, self.preprocess, self.tokenizer = load_clip(model_name, pretrained, device)
 
     def encode_paths(self, paths: Iterable[str]) -> np.ndarray:
         imgs = list(paths)
         embeds: List[np.ndarray] = []
-        with torch.no_grad():
+        # JPEG decode and resize release the GIL, so a small pool keeps the
+        # model fed; map() preserves path order.
+        with torch.no_grad(), ThreadPoolExecutor(max_workers=self.workers) as pool:
             for batch_paths in chunked(imgs, self.batch_size):
-                images = [self.preprocess(Image.open(p).convert("RGB")) for p in batch_paths]
+                images = list(pool.map(self._load_image, batch_paths))
                 image_tensor = torch.stack(images).to(self.device)
                 feats = self.model.encode_image(image_tensor)
                 feats = feats / feats.norm(dim=-1, keepdim=True)
@@ -37,6 +82,10 @@ class ClipEmbedder:
             return np.concatenate(embeds, axis=0)
         return np.zeros((0, self.model.visual.output_dim), dtype="float32")
 
+    def _load_image(self, path: str) -> torch.Tensor:
+        with Image.open(path) as img:
+            return self.preprocess(img.convert("RGB"))
+
     def encode_text(self, prompts: List[str]) -> np.ndarray:
         with torch.no_grad():
             tokens = self.tokenizer(prompts).to(self.device)
@@ -45,4 +94,4 @@ class ClipEmbedder:
         return feats.cpu().numpy()
 
 
-__all__ = ["ClipEmbedder"]
+__all__ = ["ClipEmbedder", "load_clip", "release_clip_models"]
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 from app import proxy, scanner
@@ -29,17 +32,22 @@ class Pipeline:
         cache_root = runtime.get("cache_root", "./cache")
         self.store = CacheStore(cache_root)
         self.reuse_cache = runtime.get("reuse_cache", True)
+        self.workers = max(1, int(runtime.get("workers", 1) or 1))
         self.index_path = self.store.parquet("index")
         self.proxies_path = self.store.parquet("proxies")
         self.embeds_path = self.store.parquet("embeds")
         self.clusters_path = self.store.parquet("clusters")
         self.medoid_ai_path = self.store.parquet("medoid_ai")
+        self.xmp_cfg = cfg.get("xmp", {})
+        self.prefix_ck = self.xmp_cfg.get("prefix_ck", "CK:")
+        self.prefix_ai = self.xmp_cfg.get("prefix_ai", "AI:")
         review_cfg = cfg.get("review", {})
         self.audit_path = self.store.path(review_cfg.get("audit_csv", "audit.csv"))
         ensure_dir(self.audit_path.parent)
         self._clip_embedder: Optional[ClipEmbedder] = None
         self._ck_tagger: Optional[CkTagger] = None
         self._person_detector: Optional[PersonDetector] = None
+        self._frames: Dict[Tuple[str, Optional[Tuple[str, ...]]], Tuple[Tuple[int, int], pd.DataFrame]] = {}
 
     def close(self):
         if self._clip_embedder is not None:
@@ -51,27 +59,81 @@ class Pipeline:
         if self._person_detector is not None:
             del self._person_detector
             self._person_detector = None
+        self._frames.clear()
         import torch
         torch.cuda.empty_cache()
 
     # ----------- helpers -----------
+    def _read_parquet(self, path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Read a cache parquet, reusing the last frame while mtime and size match.
+
+        ``columns`` projects the read so wide files (EXIF-heavy index) only decode
+        what the caller needs; a column missing from the file raises KeyError.
+        Callers get a copy so in-place edits never leak back into the cache.
+        """
+        path = os.fspath(path)
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        cols = tuple(columns) if columns is not None else None
+        if cols is not None:
+            full = self._frames.get((path, None))
+            if full is not None and full[0] == signature:
+                return full[1][list(cols)].copy()
+        cached = self._frames.get((path, cols))
+        if cached is None or cached[0] != signature:
+            if cols is not None:
+                missing = set(cols).difference(pq.read_schema(path).names)
+                if missing:
+                    raise KeyError(f"{path} has no column(s) {sorted(missing)}")
+            cached = (signature, pd.read_parquet(path, columns=list(cols) if cols is not None else None))
+            self._frames[(path, cols)] = cached
+        return cached[1].copy()
+
+    def _write_parquet(self, df: pd.DataFrame, path) -> None:
+        """Write via a sibling temp file and rename, so readers never see a partial file."""
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        # A same-size rewrite within one mtime tick (coarse-mtime filesystems)
+        # would pass the signature check, so drop every cached view of this path.
+        key_path = os.fspath(path)
+        for key in [key for key in self._frames if key[0] == key_path]:
+            del self._frames[key]
+
     def _load_index_df(self) -> pd.DataFrame:
-        return pd.read_parquet(self.index_path)
+        return self._read_parquet(self.index_path)
 
     def _load_proxies_df(self) -> pd.DataFrame:
-        return pd.read_parquet(self.proxies_path)
+        return self._read_parquet(self.proxies_path)
 
     def _load_embeds_df(self) -> pd.DataFrame:
-        return pd.read_parquet(self.embeds_path)
+        return self._read_parquet(self.embeds_path)
 
     def _load_clusters_df(self) -> pd.DataFrame:
-        return pd.read_parquet(self.clusters_path)
+        return self._read_parquet(self.clusters_path)
+
+    def _previous_proxy_stats(self) -> Dict[str, Dict]:
+        """Proxy stats from the last proxies.parquet keyed by sha1.
+
+        Proxies are named by content hash, so a rebuild can reuse these rows for
+        unchanged files instead of re-decoding each proxy for luminance stats.
+        """
+        columns = ["sha1", "proxy_path", "proxy_width", "proxy_height", "median_luma", "dark_ratio"]
+        try:
+            df = self._read_parquet(self.proxies_path, columns)
+        except (FileNotFoundError, KeyError):
+            # No previous file, or an older one lacking a column: build everything.
+            return {}
+        if df.empty:
+            return {}
+        return {rec.pop("sha1"): rec for rec in df.to_dict("records")}
 
     def load_medoid_tags_df(self) -> pd.DataFrame:
-        path = Path(self.medoid_ai_path)
-        if path.exists():
-            return pd.read_parquet(path)
-        return pd.DataFrame()
+        try:
+            return self._read_parquet(self.medoid_ai_path)
+        except FileNotFoundError:
+            return pd.DataFrame()
 
     def _clip(self) -> ClipEmbedder:
         if self._clip_embedder is None:
@@ -81,6 +143,7 @@ class Pipeline:
                 emb_cfg.get("pretrained", "openai"),
                 emb_cfg.get("device", "cuda"),
                 emb_cfg.get("batch_size", 128),
+                workers=self.workers,
             )
         return self._clip_embedder
 
@@ -96,7 +159,7 @@ class Pipeline:
             ck_config = CkConfig(
                 vocab=vocab,
                 max_ck_tags=ck_cfg.get("max_ck_tags", 10),
-                prefix=self.cfg.get("xmp", {}).get("prefix_ck", "CK:"),
+                prefix=self.prefix_ck,
                 clip_model=ck_cfg.get("clip_model", "ViT-L-14"),
                 clip_pretrained=ck_cfg.get("clip_pretrained", "openai"),
                 device=self.cfg.get("embeddings", {}).get("device", "cuda"),
@@ -108,7 +171,7 @@ class Pipeline:
         ai_cfg = self.cfg.get("ai_tagging", {})
         return AiTagConfig(
             max_ai_tags=ai_cfg.get("max_ai_tags", 12),
-            ai_prefix=self.cfg.get("xmp", {}).get("prefix_ai", ai_cfg.get("ai_prefix", "AI:")),
+            ai_prefix=self.xmp_cfg.get("prefix_ai", ai_cfg.get("ai_prefix", "AI:")),
             concept_bank_extra=tuple(ai_cfg.get("concept_bank_extra", [])),
             city_whitelist=tuple(ai_cfg.get("city_whitelist", [])),
             ocr_enable=bool(self.cfg.get("ocr", {}).get("enable", False)),
@@ -133,46 +196,85 @@ class Pipeline:
 
     # ----------- pipeline steps -----------
     def run_scan(self) -> pd.DataFrame:
-        if self.reuse_cache and Path(self.index_path).exists():
-            return self._load_index_df()
+        if self.reuse_cache:
+            try:
+                return self._load_index_df()
+            except FileNotFoundError:
+                pass
 
         rows = scanner.crawl(
             self.cfg.get("roots", []),
             self.cfg.get("index", {}).get("include_ext", []),
             self.cfg.get("index", {}).get("exclude_regex", []),
             self.cfg.get("date_resolver", {}),
+            workers=self.workers,
         )
         df = pd.DataFrame(rows)
         if not df.empty:
-            df.to_parquet(self.index_path, index=False)
+            self._write_parquet(df, self.index_path)
         return df
 
     def run_proxies(self, index_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
-        if self.reuse_cache and Path(self.proxies_path).exists():
-            return self._load_proxies_df()
+        if self.reuse_cache:
+            try:
+                return self._load_proxies_df()
+            except FileNotFoundError:
+                pass
         if index_df is None:
             index_df = self._load_index_df()
         proxies_dir = self.store.proxies_dir()
         settings = self.cfg.get("proxy", {})
-        records: List[Dict] = []
-        for row in tqdm(index_df.itertuples(index=False), total=len(index_df), desc="proxies"):
-            result = proxy.build_proxy(
-                row.path,
-                row.sha1,
-                proxies_dir,
-                settings.get("max_size", 1024),
-                settings.get("jpeg_quality", 90),
-            )
-            result.update({"id": row.id, "sha1": row.sha1})
-            records.append(result)
+        previous = self._previous_proxy_stats()
+        max_size = settings.get("max_size", 1024)
+        jpeg_quality = settings.get("jpeg_quality", 90)
+        # One directory listing answers "does this proxy still exist" for every
+        # reused row instead of a stat() per file.
+        proxies_root = str(proxies_dir)
+        present = set()
+        if previous:
+            try:
+                with os.scandir(proxies_root) as it:
+                    present = {entry.name for entry in it}
+            except OSError:
+                pass
+
+        def _proxy_exists(path: str) -> bool:
+            head, name = os.path.split(path)
+            if head == proxies_root:
+                return name in present
+            return os.path.exists(path)
+
+        def _proxy_for(row) -> Dict:
+            stats = previous.get(row.sha1)
+            if stats is not None and _proxy_exists(stats["proxy_path"]):
+                return stats
+            return proxy.build_proxy(row.path, row.sha1, proxies_dir, max_size, jpeg_quality)
+
+        # Proxies are keyed by content hash, so duplicate files share one build;
+        # this also keeps two workers from writing the same proxy file at once.
+        rows = list(index_df.itertuples(index=False))
+        first_by_sha1: Dict[str, object] = {}
+        for row in rows:
+            first_by_sha1.setdefault(row.sha1, row)
+        # RAW decode, resize and JPEG encode release the GIL, so threads overlap
+        # disk and CPU; map() keeps results aligned with first_by_sha1.
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            built = pool.map(_proxy_for, first_by_sha1.values())
+            stats_by_sha1 = dict(zip(first_by_sha1, tqdm(built, total=len(first_by_sha1), desc="proxies")))
+        records: List[Dict] = [
+            {**stats_by_sha1[row.sha1], "path": row.path, "id": row.id, "sha1": row.sha1} for row in rows
+        ]
         df = pd.DataFrame(records)
         if not df.empty:
-            df.to_parquet(self.proxies_path, index=False)
+            self._write_parquet(df, self.proxies_path)
         return df
 
     def run_embed(self, proxies_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
-        if self.reuse_cache and Path(self.embeds_path).exists():
-            return self._load_embeds_df()
+        if self.reuse_cache:
+            try:
+                return self._load_embeds_df()
+            except FileNotFoundError:
+                pass
         if proxies_df is None:
             proxies_df = self._load_proxies_df()
         clipper = self._clip()
@@ -184,7 +286,7 @@ class Pipeline:
             }
         )
         if not df.empty:
-            df.to_parquet(self.embeds_path, index=False)
+            self._write_parquet(df, self.embeds_path)
         return df
 
     def run_cluster(
@@ -192,15 +294,18 @@ class Pipeline:
         index_df: Optional[pd.DataFrame] = None,
         embeds_df: Optional[pd.DataFrame] = None,
     ) -> pd.DataFrame:
-        if self.reuse_cache and Path(self.clusters_path).exists():
-            return self._load_clusters_df()
+        if self.reuse_cache:
+            try:
+                return self._load_clusters_df()
+            except FileNotFoundError:
+                pass
         if index_df is None:
             index_df = self._load_index_df()
         if embeds_df is None:
             embeds_df = self._load_embeds_df()
         clusters_df = cluster_time_windowed(index_df, embeds_df, self.cfg.get("clustering", {}), self.cfg.get("date_resolver", {}))
         if not clusters_df.empty:
-            clusters_df.to_parquet(self.clusters_path, index=False)
+            self._write_parquet(clusters_df, self.clusters_path)
         return clusters_df
 
     def medoid_tags(
@@ -222,21 +327,26 @@ class Pipeline:
         if index_df is None:
             index_df = self._load_index_df()
 
-        embed_map = {row["id"]: np.asarray(row["emb"], dtype="float32") for _, row in embeds_df.iterrows()}
-        proxy_map = {row["id"]: row for _, row in proxies_df.iterrows()}
-        index_map = {row["id"]: row for _, row in index_df.iterrows()}
+        embed_map = {rid: np.asarray(emb, dtype="float32") for rid, emb in zip(embeds_df["id"], embeds_df["emb"])}
+        proxy_map = {rec["id"]: rec for rec in proxies_df.to_dict("records")}
+        index_map = {rec["id"]: rec for rec in index_df.to_dict("records")}
 
         ai_conf = self._ai_config()
         ck_tagger = self._ck()
-        ck_prefix = self.cfg.get("xmp", {}).get("prefix_ck", "CK:")
+        ck_prefix = self.prefix_ck
         people_detector = self._person()
         people_policy = self.cfg.get("people_policy", {})
         allow_openai_people = people_policy.get("allow_openai_on_people_sets", False)
         treat_people_as_nude = people_policy.get("treat_people_sets_as_nude", True)
+        ai_cfg = self.cfg.get("ai_tagging", {})
+        use_vision = bool(use_openai and ai_cfg.get("use_openai_vision", False))
+        openai_model = ai_cfg.get("openai_model", "gpt-4o-mini")
+        hand_tag = f"{ck_prefix}hand"
 
         records: List[Dict] = []
+        people_by_cid: Dict[int, bool] = {}
 
-        for _, cluster_row in clusters_df.iterrows():
+        for cluster_row in clusters_df.to_dict("records"):
             cid = int(cluster_row["cluster_id"])
             mid = int(cluster_row["medoid_id"])
             emb = embed_map.get(mid)
@@ -253,9 +363,9 @@ class Pipeline:
                 except Exception:
                     is_people = False
 
+            is_nude = bool(is_people and treat_people_as_nude)
             ck_tags: List[str] = []
             if ck_tagger is not None:
-                is_nude = bool(is_people and treat_people_as_nude)
                 ck_tags = ck_tagger.tags_for_image(
                     emb,
                     metadata=index_row,
@@ -263,19 +373,17 @@ class Pipeline:
                     has_person=is_people,
                     is_nude=is_nude,
                 )
-            else:
-                is_nude = bool(is_people and treat_people_as_nude)
 
             ai_tags = ai_tags_local(proxy_path, emb, ai_conf)
             vision_tags: List[str] = []
-            if use_openai and self.cfg.get("ai_tagging", {}).get("use_openai_vision", False):
+            if use_vision:
                 if not is_people or allow_openai_people:
                     try:
                         vision_tags = call_openai_vision_on_image(
                             proxy_path,
                             ai_conf.city_whitelist,
                             ai_conf.max_ai_tags,
-                            self.cfg.get("ai_tagging", {}).get("openai_model", "gpt-4o-mini"),
+                            openai_model,
                         )
                     except Exception:
                         vision_tags = []
@@ -289,12 +397,8 @@ class Pipeline:
                 if len(merged_ai_tags) >= ai_conf.max_ai_tags:
                     break
 
-            clusters_df.loc[clusters_df["cluster_id"] == cid, "is_people"] = bool(is_people)
-            clusters_df.loc[clusters_df["cluster_id"] == cid, "openai_allowed"] = bool(
-                (not is_people) or allow_openai_people
-            )
+            people_by_cid[cid] = bool(is_people)
 
-            hand_tag = f"{ck_prefix}hand"
             hand_suppressed = bool(is_nude and hand_tag not in ck_tags)
 
             records.append(
@@ -310,26 +414,37 @@ class Pipeline:
                 }
             )
 
+        if people_by_cid:
+            # One aligned assignment instead of a full-column mask per cluster.
+            matched = clusters_df["cluster_id"].map(people_by_cid)
+            hit = matched.notna()
+            people = matched[hit].astype(bool)
+            clusters_df.loc[hit, "is_people"] = people
+            clusters_df.loc[hit, "openai_allowed"] = ~people | bool(allow_openai_people)
+
         df = pd.DataFrame(records)
         if not df.empty:
             df["apply_cluster"] = self.cfg.get("review", {}).get("default_apply_to_cluster", True)
             df["selected"] = False
-            df.to_parquet(self.medoid_ai_path, index=False)
+            self._write_parquet(df, self.medoid_ai_path)
         if not clusters_df.empty:
-            clusters_df.to_parquet(self.clusters_path, index=False)
+            self._write_parquet(clusters_df, self.clusters_path)
         return df
 
     def export_audit(self, clusters_df: Optional[pd.DataFrame] = None, tags_df: Optional[pd.DataFrame] = None) -> Path:
         if clusters_df is None:
             clusters_df = self._load_clusters_df()
         if tags_df is None:
-            tags_df = pd.read_parquet(self.medoid_ai_path)
-        index_df = self._load_index_df()
+            tags_df = self._read_parquet(self.medoid_ai_path)
+        index_df = self._read_parquet(self.index_path, ["id", "path"])
         out = clusters_df.merge(tags_df, on=["cluster_id", "medoid_id"], how="left")
         out = out.merge(index_df[["id", "path"]], left_on="medoid_id", right_on="id", how="left")
         out = out.drop(columns=["id"])
         out = out.rename(columns={"path": "filename"})
-        out.to_csv(self.audit_path, index=False)
+        # Temp file and rename, as in _write_parquet, so a crash never leaves a truncated audit.
+        tmp_path = self.audit_path.with_name(f"{self.audit_path.name}.tmp")
+        out.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.audit_path)
         return self.audit_path
 
     def update_medoid_tags(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -337,14 +452,19 @@ class Pipeline:
         if existing.empty or df.empty:
             return existing
 
-        prefix_ck = self.cfg.get("xmp", {}).get("prefix_ck", "CK:")
-        prefix_ai = self.cfg.get("xmp", {}).get("prefix_ai", "AI:")
+        prefix_ck = self.prefix_ck
+        prefix_ai = self.prefix_ai
 
         existing = existing.set_index("cluster_id")
 
-        def _parse(value: Sequence, prefix: str) -> List[str]:
+        def _parse(value, prefix: str) -> List[str]:
+            # Review rows carry tag lists (ndarray once round-tripped through
+            # parquet); a bare string is a comma/semicolon separated list.
+            items = value if isinstance(value, (list, tuple, np.ndarray)) else [value]
+            prefix_lower = prefix.lower()
             tags: List[str] = []
-            for item in value:
+            seen = set()
+            for item in items:
                 if item is None:
                     continue
                 if isinstance(item, str):
@@ -354,29 +474,48 @@ class Pipeline:
                 for part in parts:
                     if not part:
                         continue
-                    if prefix and not part.lower().startswith(prefix.lower()):
+                    if prefix and not part.lower().startswith(prefix_lower):
                         part = f"{prefix}{part.lstrip(':')}"
-                    if part not in tags:
+                    if part not in seen:
+                        seen.add(part)
                         tags.append(part)
             return tags
 
-        for _, row in df.iterrows():
+        changed = False
+
+        def _assign(cid, column: str, value) -> None:
+            nonlocal changed
+            if column in existing.columns:
+                current = existing.at[cid, column]
+                if isinstance(current, np.ndarray):
+                    current = current.tolist()
+                try:
+                    if current == value:
+                        return
+                except (TypeError, ValueError):
+                    pass
+            existing.at[cid, column] = value
+            changed = True
+
+        # Only rows whose cluster exists can be applied; filter by key set up front.
+        known = df[df["cluster_id"].isin(existing.index)]
+        for row in known.to_dict("records"):
             cid = row.get("cluster_id")
-            if cid not in existing.index:
-                continue
             ck_raw = row.get("ck_tags")
             ai_raw = row.get("ai_tags")
             if ck_raw is not None:
-                existing.at[cid, "ck_tags"] = _parse([ck_raw], prefix_ck)
+                _assign(cid, "ck_tags", _parse(ck_raw, prefix_ck))
             if ai_raw is not None:
-                existing.at[cid, "ai_tags"] = _parse([ai_raw], prefix_ai)
+                _assign(cid, "ai_tags", _parse(ai_raw, prefix_ai))
             if "apply_cluster" in row and pd.notna(row["apply_cluster"]):
-                existing.at[cid, "apply_cluster"] = bool(row["apply_cluster"])
+                _assign(cid, "apply_cluster", bool(row["apply_cluster"]))
             if "selected" in row and pd.notna(row["selected"]):
-                existing.at[cid, "selected"] = bool(row["selected"])
+                _assign(cid, "selected", bool(row["selected"]))
 
         existing = existing.reset_index()
-        existing.to_parquet(self.medoid_ai_path, index=False)
+        # Saving an unedited review is common; skip rewriting an identical file.
+        if changed:
+            self._write_parquet(existing, self.medoid_ai_path)
         return existing
 
     def write_clusters(
@@ -388,13 +527,17 @@ class Pipeline:
         dry_run: bool = False,
     ) -> List[Dict]:
         if clusters_df is None:
-            clusters_df = self._load_clusters_df()
+            clusters_df = self._read_parquet(self.clusters_path, ["cluster_id", "member_ids", "medoid_id"])
         if tags_df is None:
-            tags_df = pd.read_parquet(self.medoid_ai_path)
+            tags_df = self._read_parquet(self.medoid_ai_path)
         if index_df is None:
-            index_df = self._load_index_df()
-        tags_map = {row["cluster_id"]: row for _, row in tags_df.iterrows()}
-        index_map = {row["id"]: row["path"] for _, row in index_df.iterrows()}
+            index_df = self._read_parquet(self.index_path, ["id", "path"])
+        tags_map = {rec["cluster_id"]: rec for rec in tags_df.to_dict("records")}
+        index_map = dict(zip(index_df["id"], index_df["path"]))
+        default_apply = self.cfg.get("review", {}).get("default_apply_to_cluster", True)
+        cluster_rows: Dict[int, tuple] = {}
+        for cid, members, medoid_id in zip(clusters_df["cluster_id"], clusters_df["member_ids"], clusters_df["medoid_id"]):
+            cluster_rows.setdefault(cid, (members, medoid_id))
 
         write_targets: List[str] = []
         keyword_lists: List[List[str]] = []
@@ -402,7 +545,7 @@ class Pipeline:
 
         def _as_list(value) -> List[str]:
             if isinstance(value, list):
-                return [str(v).strip() for v in value if str(v).strip()]
+                return [text for text in (str(v).strip() for v in value) if text]
             if value is None:
                 return []
             if isinstance(value, float) and math.isnan(value):
@@ -413,27 +556,29 @@ class Pipeline:
             return [str(value).strip()]
 
         for cid in cluster_ids:
-            row = clusters_df.loc[clusters_df["cluster_id"] == cid]
-            if row.empty:
+            cluster_row = cluster_rows.get(cid)
+            if cluster_row is None:
                 continue
-            members = row.iloc[0]["member_ids"]
+            members, medoid_id = cluster_row
             if not isinstance(members, list):
                 members = list(members)
             tags = tags_map.get(cid)
             if tags is None:
                 continue
             keywords = []
+            seen = set()
             for seq in (_as_list(tags.get("ck_tags", [])), _as_list(tags.get("ai_tags", []))):
                 for tag in seq:
-                    if tag and tag not in keywords:
+                    if tag and tag not in seen:
+                        seen.add(tag)
                         keywords.append(tag)
             if not keywords:
                 continue
-            cluster_apply = bool(tags.get("apply_cluster", self.cfg.get("review", {}).get("default_apply_to_cluster", True)))
+            cluster_apply = bool(tags.get("apply_cluster", default_apply))
             if cluster_apply:
                 paths = [index_map[mid] for mid in members if mid in index_map]
             else:
-                paths = [index_map.get(row.iloc[0]["medoid_id"])]
+                paths = [index_map.get(medoid_id)]
             for path in paths:
                 if path:
                     write_targets.append(path)
@@ -454,9 +599,9 @@ class Pipeline:
             write_keywords(
                 write_targets,
                 keyword_lists,
-                self.cfg.get("xmp", {}).get("prefix_ck", "CK:"),
-                self.cfg.get("xmp", {}).get("prefix_ai", "AI:"),
-                workers=self.cfg.get("xmp", {}).get("write_concurrency", 4),
+                self.prefix_ck,
+                self.prefix_ai,
+                workers=self.xmp_cfg.get("write_concurrency", 4),
             )
         return operations
 
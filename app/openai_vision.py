@@ -3,7 +3,8 @@ from __future__ import annotations
 import base64
 import json
 from io import BytesIO
-from typing import List, Sequence
+from pathlib import Path
+from typing import List, Sequence, Tuple
 
 from PIL import Image
 
@@ -22,11 +23,27 @@ Return tags prefixed with "ai:" and keep them short.
 """
 
 
-def _b64_png(path: str) -> str:
-    image = Image.open(path).convert("RGB")
-    buffer = BytesIO()
-    image.save(buffer, format="PNG")
-    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+# Formats the vision endpoints accept as-is; anything else is re-encoded to PNG.
+_PASSTHROUGH_MIME = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+
+def _b64_image(path: str) -> Tuple[str, str]:
+    """Return (mime, base64) for ``path``, sending proxy bytes without re-encoding."""
+    mime = _PASSTHROUGH_MIME.get(Path(path).suffix.lower())
+    if mime is not None:
+        data = Path(path).read_bytes()
+    else:
+        mime = "image/png"
+        buffer = BytesIO()
+        with Image.open(path) as image:
+            image.convert("RGB").save(buffer, format="PNG")
+        data = buffer.getvalue()
+    return mime, base64.b64encode(data).decode("ascii")
 
 
 def call_openai_vision_on_image(
@@ -43,7 +60,7 @@ def call_openai_vision_on_image(
 
     sys_prompt = SYSTEM_PROMPT.format(max_tags=max_tags)
     usr_prompt = USER_PROMPT.format(city_list=", ".join(city_whitelist))
-    img_b64 = _b64_png(image_path)
+    mime, img_b64 = _b64_image(image_path)
 
     try:
         from openai import OpenAI
@@ -76,7 +93,7 @@ def call_openai_vision_on_image(
                     "role": "user",
                     "content": [
                         {"type": "text", "text": usr_prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{img_b64}"}},
+                        {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{img_b64}"}},
                     ],
                 },
             ],
@@ -57,27 +57,35 @@ def build_proxy(
     jpeg_quality: int = 90,
     overwrite: bool = False,
 ) -> Dict:
-    proxies_dir = ensure_dir(proxies_dir)
-    out_path = proxies_dir / f"{sha1}.jpg"
-    if out_path.exists() and not overwrite:
-        with Image.open(out_path) as img:
-            median, dark_ratio = _luminance_stats(img)
-            width, height = img.size
-        return {
-            "path": source_path,
-            "proxy_path": str(out_path),
-            "proxy_width": width,
-            "proxy_height": height,
-            "median_luma": median,
-            "dark_ratio": dark_ratio,
-        }
+    out_path = Path(proxies_dir) / f"{sha1}.jpg"
+    if not overwrite:
+        try:
+            with Image.open(out_path) as img:
+                median, dark_ratio = _luminance_stats(img)
+                width, height = img.size
+        except FileNotFoundError:
+            pass
+        else:
+            return {
+                "path": source_path,
+                "proxy_path": str(out_path),
+                "proxy_width": width,
+                "proxy_height": height,
+                "median_luma": median,
+                "dark_ratio": dark_ratio,
+            }
 
     image = _load_image(Path(source_path))
     image = _resize(image, max_edge)
     median, dark_ratio = _luminance_stats(image)
     width, height = image.size
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    image.save(out_path, format="JPEG", quality=jpeg_quality, optimize=True)
+    try:
+        image.save(out_path, format="JPEG", quality=jpeg_quality, optimize=True)
+    except FileNotFoundError:
+        # The pipeline creates proxies_dir once up front; only other callers
+        # pay for creating it here.
+        ensure_dir(out_path.parent)
+        image.save(out_path, format="JPEG", quality=jpeg_quality, optimize=True)
 
     return {
         "path": source_path,
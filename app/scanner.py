@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import exifread
 from PIL import Image
@@ -155,72 +156,95 @@ def resolve_datetime(meta: Dict, cfg: Dict) -> Tuple[Optional[datetime], float,
     return chosen, min(trust, 1.0), used
 
 
+def _iter_files(root: str) -> Iterator[os.DirEntry]:
+    """Yield file entries under root in os.walk order, without following dir symlinks.
+
+    DirEntry caches its stat result, so callers avoid a second stat per file.
+    """
+    try:
+        scan = os.scandir(root)
+    except OSError:
+        return
+    subdirs: List[str] = []
+    with scan:
+        for entry in scan:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                yield entry
+            elif not entry.is_symlink():
+                subdirs.append(entry.path)
+    for subdir in subdirs:
+        yield from _iter_files(subdir)
+
+
+def _describe_file(full_path: str, ext: str, stat_res, date_cfg: Dict) -> Dict:
+    sha1 = sha1_file(full_path)
+    exif_meta = _read_exif_metadata(full_path)
+    width, height = _read_dimensions(full_path)
+    fs_mtime, fs_ctime = _fs_datetimes(stat_res)
+    path_tokens = path_date_tokens(full_path)
+
+    meta = {
+        "path": full_path,
+        "ext": ext,
+        "sha1": sha1,
+        "bytes": stat_res.st_size,
+        "mtime": stat_res.st_mtime,
+        "ctime": stat_res.st_ctime,
+        "fs_mtime": fs_mtime,
+        "fs_ctime": fs_ctime,
+        "width": width,
+        "height": height,
+        **exif_meta,
+        "path_tokens": path_tokens,
+    }
+
+    resolved_dt, trust, used = resolve_datetime(meta, date_cfg)
+    meta.update(
+        {
+            "resolved_datetime": resolved_dt,
+            "date_trust": trust,
+            "date_signals_used": used,
+        }
+    )
+    return meta
+
+
 def crawl(
     roots: Iterable[str],
     include_ext: Iterable[str],
     exclude_regex: Iterable[str],
     date_cfg: Optional[Dict] = None,
+    workers: int = 1,
 ) -> List[Dict]:
     include = {ext.lower() for ext in include_ext}
     patterns = [re.compile(pat, re.IGNORECASE) for pat in exclude_regex]
     date_cfg = date_cfg or {}
 
-    rows: List[Dict] = []
-    seq = 0
-
+    candidates: List[Tuple[str, str, os.stat_result]] = []
     for root in roots:
-        root_path = Path(root)
-        if not root_path.exists():
-            continue
-        for dirpath, _, filenames in os.walk(root):
-            for name in filenames:
-                ext = Path(name).suffix.lower()
-                if include and ext not in include:
-                    continue
-                if any(p.search(name) for p in patterns):
-                    continue
-
-                full_path = os.path.join(dirpath, name)
-                try:
-                    stat_res = os.stat(full_path)
-                except FileNotFoundError:
-                    continue
-
-                sha1 = sha1_file(full_path)
-                exif_meta = _read_exif_metadata(full_path)
-                width, height = _read_dimensions(full_path)
-                fs_mtime, fs_ctime = _fs_datetimes(stat_res)
-                path_tokens = path_date_tokens(full_path)
-
-                meta = {
-                    "id": seq,
-                    "path": full_path,
-                    "ext": ext,
-                    "sha1": sha1,
-                    "bytes": stat_res.st_size,
-                    "mtime": stat_res.st_mtime,
-                    "ctime": stat_res.st_ctime,
-                    "fs_mtime": fs_mtime,
-                    "fs_ctime": fs_ctime,
-                    "width": width,
-                    "height": height,
-                    **exif_meta,
-                    "path_tokens": path_tokens,
-                }
-
-                resolved_dt, trust, used = resolve_datetime(meta, date_cfg)
-                meta.update(
-                    {
-                        "resolved_datetime": resolved_dt,
-                        "date_trust": trust,
-                        "date_signals_used": used,
-                    }
-                )
-
-                rows.append(meta)
-                seq += 1
-
-    return rows
+        # _iter_files yields nothing for a missing root, so no separate exists() probe.
+        for entry in _iter_files(root):
+            name = entry.name
+            ext = Path(name).suffix.lower()
+            if include and ext not in include:
+                continue
+            if any(p.search(name) for p in patterns):
+                continue
+            try:
+                stat_res = entry.stat()
+            except FileNotFoundError:
+                continue
+            candidates.append((entry.path, ext, stat_res))
+
+    # Hashing and header reads are I/O bound and release the GIL, so a small
+    # pool overlaps them; map() keeps rows (and ids) in walk order.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        described = pool.map(lambda item: _describe_file(*item, date_cfg), candidates)
+        return [{"id": seq, **meta} for seq, meta in enumerate(described)]
 
 
 __all__ = ["crawl", "resolve_datetime"]
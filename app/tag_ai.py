@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import heapq
 import json
 import re
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Iterable, List, Optional, Sequence, Tuple
 
@@ -9,7 +12,7 @@ import numpy as np
 import torch
 from PIL import Image
 
-import open_clip
+from app.embed import load_clip
 
 try:
     from transformers import BlipForConditionalGeneration, BlipProcessor
@@ -23,14 +26,16 @@ except Exception:  # pragma: no cover
     pytesseract = None
 
 _DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-_BLIP = None
-_BLIP_P = None
-_CLIP = None
-_CLIP_PREPROCESS = None
-_CLIP_TOKENIZER = None
+# Normalised CLIP text embeddings per (model, pretrained, device, concept).
+# Concept banks and city names repeat for every medoid, so most lookups hit.
+_TEXT_EMBEDS: "OrderedDict[Tuple[str, str, str, str], torch.Tensor]" = OrderedDict()
+_TEXT_EMBEDS_MAX = 4096
+_TEXT_EMBEDS_LOCK = threading.Lock()
+_BLIP_MODELS: dict[str, tuple] = {}
+_BLIP_LOCK = threading.Lock()
 
 
-@dataclass
+@dataclass(slots=True)
 class AiTagConfig:
     max_ai_tags: int = 12
     ai_prefix: str = "AI:"
@@ -45,25 +50,21 @@ class AiTagConfig:
 
 
 def _load_blip(model_name: str):
-    global _BLIP, _BLIP_P
+    loaded = _BLIP_MODELS.get(model_name)
+    if loaded is not None:
+        return loaded
     if BlipForConditionalGeneration is None or BlipProcessor is None:
         raise RuntimeError("transformers[BLIP] not installed")
-    if _BLIP is None:
-        _BLIP_P = BlipProcessor.from_pretrained(model_name)
-        _BLIP = BlipForConditionalGeneration.from_pretrained(model_name)
-        _BLIP.to(_DEVICE)
-        _BLIP.eval()
-
-
-def _load_clip(clip_model: str, pretrained: str, device: str):
-    global _CLIP, _CLIP_PREPROCESS, _CLIP_TOKENIZER
-    if _CLIP is None:
-        model, _, preprocess = open_clip.create_model_and_transforms(clip_model, pretrained=pretrained, device=device)
-        tokenizer = open_clip.get_tokenizer(clip_model)
-        model.eval()
-        _CLIP = model
-        _CLIP_PREPROCESS = preprocess
-        _CLIP_TOKENIZER = tokenizer
+    with _BLIP_LOCK:
+        loaded = _BLIP_MODELS.get(model_name)
+        if loaded is None:
+            processor = BlipProcessor.from_pretrained(model_name)
+            model = BlipForConditionalGeneration.from_pretrained(model_name)
+            model.to(_DEVICE)
+            model.eval()
+            loaded = (processor, model)
+            _BLIP_MODELS[model_name] = loaded
+    return loaded
 
 
 _WORD_RE = re.compile(r"[A-Za-z][A-Za-z\-&']+")
@@ -96,6 +97,7 @@ _STOP = {
     "being",
     "been",
 }
+_JUNK = {"photo", "image", "picture"}
 
 
 def _clean_tokens(text: str) -> List[str]:
@@ -126,12 +128,12 @@ def _read_image(path: str) -> Image.Image:
 
 
 def blip_caption(path: str, model_name: str) -> str:
-    _load_blip(model_name)
+    processor, model = _load_blip(model_name)
     image = _read_image(path)
-    inputs = _BLIP_P(images=image, return_tensors="pt").to(_DEVICE)
+    inputs = processor(images=image, return_tensors="pt").to(_DEVICE)
     with torch.no_grad():
-        output = _BLIP.generate(**inputs, max_new_tokens=40)
-    caption = _BLIP_P.decode(output[0], skip_special_tokens=True)
+        output = model.generate(**inputs, max_new_tokens=40)
+    caption = processor.decode(output[0], skip_special_tokens=True)
     return caption.strip()
 
 
@@ -166,10 +168,42 @@ def mine_concepts_from_caption(
     grams = _ngram(tokens, 1, 2)
     extras = [w.lower() for w in extra_bank]
     cities = [w.lower() for w in city_whitelist]
-    candidates = _dedupe(extras + cities + grams)
-    junk = {"photo", "image", "picture"}
-    candidates = [c for c in candidates if 3 <= len(c) <= 32 and c not in junk]
-    return candidates[:limit]
+    candidates: List[str] = []
+    for c in _dedupe(extras + cities + grams):
+        if len(candidates) >= limit:
+            break
+        if 3 <= len(c) <= 32 and c not in _JUNK:
+            candidates.append(c)
+    return candidates
+
+
+def _concept_text_embeds(concepts: Sequence[str], clip_model: str, pretrained: str, device: str) -> torch.Tensor:
+    keys = [(clip_model, pretrained, device, c) for c in concepts]
+    found: dict[Tuple[str, str, str, str], torch.Tensor] = {}
+    with _TEXT_EMBEDS_LOCK:
+        for key in keys:
+            row = _TEXT_EMBEDS.get(key)
+            if row is not None:
+                _TEXT_EMBEDS.move_to_end(key)
+                found[key] = row
+    # Encode outside the lock; rows are held locally so a concurrent eviction
+    # cannot drop them before they are stacked.
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    if missing:
+        model, _, tokenizer = load_clip(clip_model, pretrained, device)
+        prompts = [f"a photo of {key[3]}" for key in missing]
+        tokens = tokenizer(prompts).to(device)
+        with torch.no_grad():
+            text = model.encode_text(tokens)
+            text = text / (text.norm(dim=-1, keepdim=True) + 1e-6)
+        # Clone each row: a row view would keep the whole batch buffer on the device.
+        fresh = {key: row.detach().clone() for key, row in zip(missing, text)}
+        found.update(fresh)
+        with _TEXT_EMBEDS_LOCK:
+            _TEXT_EMBEDS.update(fresh)
+            while len(_TEXT_EMBEDS) > _TEXT_EMBEDS_MAX:
+                _TEXT_EMBEDS.popitem(last=False)
+    return torch.stack([found[key] for key in keys])
 
 
 def score_concepts_with_clip(
@@ -178,21 +212,22 @@ def score_concepts_with_clip(
     clip_model: str,
     pretrained: str,
     device: str,
+    limit: Optional[int] = None,
 ) -> List[Tuple[str, float]]:
-    _load_clip(clip_model, pretrained, device)
     img = torch.tensor(image_embedding, device=device, dtype=torch.float32)
     if img.ndim == 1:
         img = img[None, :]
     img = img / (img.norm(dim=-1, keepdim=True) + 1e-6)
-    prompts = [f"a photo of {c}" for c in concepts]
-    tokens = _CLIP_TOKENIZER(prompts).to(device)
+    text = _concept_text_embeds(concepts, clip_model, pretrained, device)
     with torch.no_grad():
-        text = _CLIP.encode_text(tokens)
-        text = text / (text.norm(dim=-1, keepdim=True) + 1e-6)
         sims = (img @ text.T).float().cpu().numpy().ravel()
-    pairs = list(zip(concepts, sims.tolist()))
-    pairs.sort(key=lambda it: it[1], reverse=True)
-    return pairs
+    values = sims.tolist()
+    if limit is not None and limit < len(values):
+        # nlargest keeps the stable sort's tie order at O(n log k).
+        order = heapq.nlargest(limit, range(len(values)), key=values.__getitem__)
+    else:
+        order = np.argsort(-sims, kind="stable").tolist()
+    return [(concepts[i], values[i]) for i in order]
 
 
 def ai_tags_local(proxy_path: str, image_embedding: np.ndarray, cfg: AiTagConfig) -> List[str]:
@@ -214,9 +249,9 @@ def ai_tags_local(proxy_path: str, image_embedding: np.ndarray, cfg: AiTagConfig
         clip_model=cfg.clip_model,
         pretrained=cfg.clip_pretrained,
         device=cfg.clip_device if torch.cuda.is_available() else "cpu",
+        limit=cfg.max_ai_tags,
     )
-    top = [concept for concept, _ in scored[: cfg.max_ai_tags]]
-    return [f"{cfg.ai_prefix}{concept}" for concept in top]
+    return [f"{cfg.ai_prefix}{concept}" for concept, _ in scored]
 
 
 __all__ = ["AiTagConfig", "ai_tags_local"]
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Sequence
+from typing import Dict, Iterable, List, Sequence, Tuple
 
 import numpy as np
 
 from app.embed import ClipEmbedder
 from app.heuristics import studio_black_vs_night, suppress_hand_on_nude
 
+# Vocab prompt embeddings per (model, pretrained, device, prompts). Every config
+# load or UI session builds a new Pipeline (and CkTagger), usually with the same
+# vocab, so the prompts are encoded once per process instead of per tagger.
+_VOCAB_EMBEDS: "OrderedDict[Tuple[str, str, str, Tuple[str, ...]], np.ndarray]" = OrderedDict()
+_VOCAB_EMBEDS_MAX = 4
+_VOCAB_EMBEDS_LOCK = threading.Lock()
 
-@dataclass
+
+@dataclass(slots=True)
 class CkConfig:
     vocab: Dict[str, Sequence[str]]
     max_ck_tags: int
@@ -30,8 +39,30 @@ class CkTagger:
             for label in cfg.vocab.get(section, []):
                 prompts.append(f"a photo of {label}")
                 self.labels.append(label)
-        text_embeds = self.embedder.encode_text(prompts) if prompts else np.zeros((0, 1))
-        self.text_embeds = text_embeds.astype("float32")
+        self.text_embeds = self._vocab_embeds(prompts)
+
+        # (lowercase needle, tag) pairs for EXIF gear matching, built once per tagger.
+        self.gear_tags: List[tuple[str, str]] = [
+            (gear.lower(), f"{cfg.prefix}{gear}") for gear in cfg.vocab.get("gear", [])
+        ]
+
+    def _vocab_embeds(self, prompts: List[str]) -> np.ndarray:
+        if not prompts:
+            return np.zeros((0, 1), dtype="float32")
+        key = (self.cfg.clip_model, self.cfg.clip_pretrained, self.embedder.device, tuple(prompts))
+        with _VOCAB_EMBEDS_LOCK:
+            cached = _VOCAB_EMBEDS.get(key)
+            if cached is not None:
+                _VOCAB_EMBEDS.move_to_end(key)
+                return cached
+        text_embeds = self.embedder.encode_text(prompts).astype("float32")
+        # Shared between taggers, so freeze it against in-place edits.
+        text_embeds.setflags(write=False)
+        with _VOCAB_EMBEDS_LOCK:
+            _VOCAB_EMBEDS[key] = text_embeds
+            while len(_VOCAB_EMBEDS) > _VOCAB_EMBEDS_MAX:
+                _VOCAB_EMBEDS.popitem(last=False)
+        return text_embeds
 
     def score(self, image_embedding: np.ndarray) -> List[tuple[str, float]]:
         if self.text_embeds.size == 0:
@@ -41,9 +72,10 @@ class CkTagger:
             img = img[None, :]
         img = img / (np.linalg.norm(img, axis=1, keepdims=True) + 1e-6)
         scores = (img @ self.text_embeds.T)[0]
-        pairs = list(zip(self.labels, scores.tolist()))
-        pairs.sort(key=lambda p: p[1], reverse=True)
-        return pairs
+        order = np.argsort(-scores, kind="stable").tolist()
+        values = scores.tolist()
+        labels = self.labels
+        return [(labels[i], values[i]) for i in order]
 
     def tags_for_image(
         self,
@@ -72,23 +104,24 @@ class CkTagger:
 
         # Add gear tags directly from metadata
         prefix = self.cfg.prefix
-        make = (metadata.get("make") or "").lower()
-        model = (metadata.get("model") or "").lower()
-        lens = (metadata.get("lens_model") or "").lower()
-
-        for gear in self.cfg.vocab.get("gear", []):
-            low = gear.lower()
-            if low in make or low in model or low in lens:
-                tags.append(f"{prefix}{gear}")
+        # One lowercase haystack per image; newlines keep matches within a field.
+        haystack = "\n".join(
+            (metadata.get(key) or "") for key in ("make", "model", "lens_model")
+        ).lower()
+        for needle, tag in self.gear_tags:
+            if needle in haystack:
+                tags.append(tag)
 
+        max_tags = self.cfg.max_ck_tags
+        # Set mirror of tags for O(1) duplicate checks; the list keeps order.
+        seen = set(tags)
         for label, score in scored:
             tag = f"{prefix}{label}"
-            if tag in suppress:
-                continue
-            if tag in tags:
+            if tag in suppress or tag in seen:
                 continue
+            seen.add(tag)
             tags.append(tag)
-            if len(tags) >= self.cfg.max_ck_tags:
+            if len(tags) >= max_tags:
                 break
         return tags
 
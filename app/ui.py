@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Dict, Iterable
 
@@ -7,16 +8,33 @@ import time
 
 import gradio as gr
 import pandas as pd
-import yaml
 import numpy as np
 
+from app.config import load_config as _load_cfg
+
 if TYPE_CHECKING:  # pragma: no cover
     from app.jobs import Pipeline
 
 
-def _load_cfg(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as fh:
-        return yaml.safe_load(fh)
+_REVIEW_FLAGS = (
+    ("is_people", "people"),
+    ("is_nude_assumed", "nude-sensitive"),
+    ("openai_used", "vision"),
+    ("hand_suppressed", "hand-suppressed"),
+)
+
+
+def _review_tag_list(value) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value if str(v).strip()]
+    if isinstance(value, str):
+        parts = [part.strip() for part in value.replace(";", ",").split(",")]
+        return [part for part in parts if part]
+    if pd.isna(value):
+        return []
+    return [str(value)]
 
 
 def format_review_rows(rows: Iterable[pd.Series]) -> pd.DataFrame:
@@ -26,32 +44,9 @@ def format_review_rows(rows: Iterable[pd.Series]) -> pd.DataFrame:
             _, row = row
         cid = int(row.get("cluster_id"))
         mid = int(row.get("medoid_id"))
-        ck_raw = row.get("ck_tags")
-        ai_raw = row.get("ai_tags")
-
-        def _as_list(value) -> list[str]:
-            if value is None:
-                return []
-            if isinstance(value, list):
-                return [str(v) for v in value if str(v).strip()]
-            if isinstance(value, str):
-                parts = [part.strip() for part in value.replace(";", ",").split(",")]
-                return [part for part in parts if part]
-            if pd.isna(value):
-                return []
-            return [str(value)]
-
-        ck_tags = ", ".join(_as_list(ck_raw))
-        ai_tags = ", ".join(_as_list(ai_raw))
-        flags = []
-        if row.get("is_people"):
-            flags.append("people")
-        if row.get("is_nude_assumed"):
-            flags.append("nude-sensitive")
-        if row.get("openai_used"):
-            flags.append("vision")
-        if row.get("hand_suppressed"):
-            flags.append("hand-suppressed")
+        ck_tags = ", ".join(_review_tag_list(row.get("ck_tags")))
+        ai_tags = ", ".join(_review_tag_list(row.get("ai_tags")))
+        flags = [label for key, label in _REVIEW_FLAGS if row.get(key)]
         review_rows.append(
             {
                 "cluster_id": cid,
@@ -116,13 +111,14 @@ def build_ui():
         if cfg is None:
             return "Load config first", state_value
 
-        old_pipeline = state_value.get("pipeline")
-        if old_pipeline is not None:
-            old_pipeline.close()
-
-        cfg.setdefault("people_policy", {})["allow_openai_on_people_sets"] = bool(value)
-        state_value["cfg"] = cfg
-        state_value["pipeline"] = Pipeline(cfg)
+        # Pipeline reads the policy from the shared cfg dict, so keep it (and any
+        # loaded models) instead of rebuilding on every toggle.
+        policy = cfg.setdefault("people_policy", {})
+        if policy.get("allow_openai_on_people_sets", False) == bool(value):
+            return gr.update(), state_value
+        policy["allow_openai_on_people_sets"] = bool(value)
+        if state_value.get("pipeline") is None:
+            state_value["pipeline"] = Pipeline(cfg)
         return ("Updated people policy", state_value)
 
     def toggle_apply_cluster(value: bool, state_value: Dict):
@@ -130,13 +126,12 @@ def build_ui():
         if cfg is None:
             return "Load config first", state_value
 
-        old_pipeline = state_value.get("pipeline")
-        if old_pipeline is not None:
-            old_pipeline.close()
-
-        cfg.setdefault("review", {})["default_apply_to_cluster"] = bool(value)
-        state_value["cfg"] = cfg
-        state_value["pipeline"] = Pipeline(cfg)
+        review_cfg = cfg.setdefault("review", {})
+        if review_cfg.get("default_apply_to_cluster", True) == bool(value):
+            return gr.update(), state_value
+        review_cfg["default_apply_to_cluster"] = bool(value)
+        if state_value.get("pipeline") is None:
+            state_value["pipeline"] = Pipeline(cfg)
         return ("Updated apply-to-cluster", state_value)
 
     def run_step(step: str, state_value: Dict):
@@ -195,21 +190,38 @@ def build_ui():
         return f"Audit written: {path}", state_value
 
     def _get_proxy_map(state_value: Dict, pipeline: "Pipeline") -> Dict[int, str]:
+        """Medoid id -> proxy path, rebuilt only when the proxies source changes."""
         review_state = state_value.setdefault("review", {})
-        proxy_map = review_state.get("proxy_map")
-        if proxy_map:
-            return proxy_map
         dfs = state_value.get("dfs", {})
         proxies_df = dfs.get("proxies")
-        if proxies_df is None:
+        # An in-memory frame is matched by identity (holding the frame itself, since
+        # ids are reused once a frame is freed); the file by its stat signature.
+        if proxies_df is not None:
+            source = None
+        else:
+            try:
+                st = os.stat(pipeline.proxies_path)
+                source = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                source = None
+        proxy_map = review_state.get("proxy_map")
+        if (
+            proxy_map is not None
+            and review_state.get("proxy_map_df") is proxies_df
+            and review_state.get("proxy_map_source") == source
+        ):
+            return proxy_map
+        review_state["proxy_map_df"] = proxies_df
+        if proxies_df is None and source is not None:
             try:
                 proxies_df = pipeline._load_proxies_df()
             except Exception:
                 proxies_df = None
         proxy_map = {}
         if proxies_df is not None and not proxies_df.empty:
-            proxy_map = {row["id"]: row["proxy_path"] for _, row in proxies_df.iterrows()}
+            proxy_map = dict(zip(proxies_df["id"], proxies_df["proxy_path"]))
         review_state["proxy_map"] = proxy_map
+        review_state["proxy_map_source"] = source
         return proxy_map
 
     def _review_state(state_value: Dict) -> Dict:
@@ -294,6 +306,19 @@ def build_ui():
             lines.append(f"Flags: {', '.join(item['flags'])}")
         return "\n".join(lines)
 
+    def _refresh_gallery_entry(review_state: Dict[str, Any], cid: int) -> bool:
+        """Re-caption one cluster in place; return True when the gallery changed."""
+        pos = review_state.get("gallery_pos", {}).get(cid)
+        item = review_state.get("items", {}).get(cid)
+        gallery = review_state.get("gallery", [])
+        if pos is None or item is None or pos >= len(gallery):
+            return False
+        entry = [str(item.get("proxy_path")), _gallery_caption(item)]
+        if gallery[pos] == entry:
+            return False
+        gallery[pos] = entry
+        return True
+
     def _members_gallery(item: Dict[str, Any], review_state: Dict[str, Any]) -> list[list[str]]:
         proxy_map = review_state.get("proxy_map", {})
         index_map = review_state.get("index_map", {})
@@ -444,10 +469,10 @@ def build_ui():
         proxy_map = _get_proxy_map(state_value, pipeline)
         cluster_map = {}
         if clusters_df is not None and not clusters_df.empty:
-            cluster_map = {int(row["cluster_id"]): row.to_dict() for _, row in clusters_df.iterrows()}
+            cluster_map = {int(rec["cluster_id"]): rec for rec in clusters_df.to_dict("records")}
         index_map = {}
         if index_df is not None and not index_df.empty:
-            index_map = {int(row["id"]): row.to_dict() for _, row in index_df.iterrows()}
+            index_map = {int(rec["id"]): rec for rec in index_df.to_dict("records")}
 
         review_state["proxy_map"] = proxy_map
         review_state["cluster_map"] = cluster_map
@@ -466,15 +491,7 @@ def build_ui():
             proxy_path = proxy_map.get(mid)
             if not proxy_path:
                 continue
-            flags = []
-            if record.get("is_people"):
-                flags.append("people")
-            if record.get("is_nude_assumed"):
-                flags.append("nude-sensitive")
-            if record.get("openai_used"):
-                flags.append("vision")
-            if record.get("hand_suppressed"):
-                flags.append("hand-suppressed")
+            flags = [label for key, label in _REVIEW_FLAGS if record.get(key)]
 
             member_ids = _safe_list(cluster_row.get("member_ids"))
             cluster_size = len(member_ids)
@@ -503,6 +520,7 @@ def build_ui():
         review_state["items"] = items
         review_state["order"] = order
         review_state["gallery"] = gallery_entries
+        review_state["gallery_pos"] = {cid: pos for pos, cid in enumerate(order)}
         review_state["current"] = order[0] if order else None
 
         elapsed = time.perf_counter() - start_time
@@ -546,15 +564,15 @@ def build_ui():
         cid = _update_tags(state_value, "ck_tags", values or [])
         if cid is None:
             return _detail_outputs(state_value, -1, "Select a cluster first", update_gallery=False)
-        refresh_gallery(state_value)
-        return _detail_outputs(state_value, cid, "Updated CK tags", update_gallery=True)
+        changed = _refresh_gallery_entry(_review_state(state_value), cid)
+        return _detail_outputs(state_value, cid, "Updated CK tags", update_gallery=changed)
 
     def update_ai_tags(values: list[str], state_value: Dict):
         cid = _update_tags(state_value, "ai_tags", values or [])
         if cid is None:
             return _detail_outputs(state_value, -1, "Select a cluster first", update_gallery=False)
-        refresh_gallery(state_value)
-        return _detail_outputs(state_value, cid, "Updated AI tags", update_gallery=True)
+        changed = _refresh_gallery_entry(_review_state(state_value), cid)
+        return _detail_outputs(state_value, cid, "Updated AI tags", update_gallery=changed)
 
     def add_ck_tag(new_tag: str, state_value: Dict):
         review_state = _review_state(state_value)
@@ -565,12 +583,9 @@ def build_ui():
         additions = _split_tags(new_tag)
         if not additions:
             return _detail_outputs(state_value, current, "No CK tags added", update_gallery=False)
-        for tag in additions:
-            if tag not in tags:
-                tags.append(tag)
-        review_state["items"][current]["ck_tags"] = _tag_choices(tags)
-        refresh_gallery(state_value)
-        return _detail_outputs(state_value, current, f"Added {len(additions)} CK tag(s)", update_gallery=True)
+        review_state["items"][current]["ck_tags"] = _tag_choices([*tags, *additions])
+        changed = _refresh_gallery_entry(review_state, current)
+        return _detail_outputs(state_value, current, f"Added {len(additions)} CK tag(s)", update_gallery=changed)
 
     def add_ai_tag(new_tag: str, state_value: Dict):
         review_state = _review_state(state_value)
@@ -581,12 +596,9 @@ def build_ui():
         additions = _split_tags(new_tag)
         if not additions:
             return _detail_outputs(state_value, current, "No AI tags added", update_gallery=False)
-        for tag in additions:
-            if tag not in tags:
-                tags.append(tag)
-        review_state["items"][current]["ai_tags"] = _tag_choices(tags)
-        refresh_gallery(state_value)
-        return _detail_outputs(state_value, current, f"Added {len(additions)} AI tag(s)", update_gallery=True)
+        review_state["items"][current]["ai_tags"] = _tag_choices([*tags, *additions])
+        changed = _refresh_gallery_entry(review_state, current)
+        return _detail_outputs(state_value, current, f"Added {len(additions)} AI tag(s)", update_gallery=changed)
 
     def set_apply_cluster(value: bool, state_value: Dict):
         review_state = _review_state(state_value)
@@ -594,8 +606,8 @@ def build_ui():
         if current is None:
             return _detail_outputs(state_value, -1, "Select a cluster first", update_gallery=False)
         review_state.get("items", {}).get(current, {})["apply_cluster"] = bool(value)
-        refresh_gallery(state_value)
-        return _detail_outputs(state_value, current, "Updated cluster scope", update_gallery=True)
+        changed = _refresh_gallery_entry(review_state, current)
+        return _detail_outputs(state_value, current, "Updated cluster scope", update_gallery=changed)
 
     def set_selected(value: bool, state_value: Dict):
         review_state = _review_state(state_value)
@@ -603,8 +615,8 @@ def build_ui():
         if current is None:
             return _detail_outputs(state_value, -1, "Select a cluster first", update_gallery=False)
         review_state.get("items", {}).get(current, {})["selected"] = bool(value)
-        refresh_gallery(state_value)
-        return _detail_outputs(state_value, current, "Updated selection", update_gallery=True)
+        changed = _refresh_gallery_entry(review_state, current)
+        return _detail_outputs(state_value, current, "Updated selection", update_gallery=changed)
 
     def mark_cluster(selected: bool, state_value: Dict):
         review_state = _review_state(state_value)
@@ -613,18 +625,21 @@ def build_ui():
             return _detail_outputs(state_value, -1, "Select a cluster first", update_gallery=False)
         review_state.get("items", {}).get(current, {})["selected"] = selected
         message = "Marked for write" if selected else "Skipped cluster"
-        refresh_gallery(state_value)
-        return _detail_outputs(state_value, current, message, update_gallery=True)
+        changed = _refresh_gallery_entry(review_state, current)
+        return _detail_outputs(state_value, current, message, update_gallery=changed)
 
     def refresh_gallery(state_value: Dict):
         review_state = _review_state(state_value)
         gallery_entries = []
+        gallery_pos: Dict[int, int] = {}
         for cid in review_state.get("order", []):
             item = review_state.get("items", {}).get(cid)
             if not item:
                 continue
+            gallery_pos[cid] = len(gallery_entries)
             gallery_entries.append([str(item.get("proxy_path")), _gallery_caption(item)])
         review_state["gallery"] = gallery_entries
+        review_state["gallery_pos"] = gallery_pos
         return (
             f"Gallery refreshed ({len(gallery_entries)} clusters)",
             state_value,
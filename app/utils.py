@@ -8,6 +8,33 @@ from pathlib import Path
 from typing import Iterable, Iterator, Sequence, Tuple
 
 _PATH_TOKEN_RE = re.compile(r"(19|20)\d{2}(?:[\-_](0?[1-9]|1[0-2])(?:[\-_](0?[1-9]|[12]\d|3[01]))?)?")
+_DATETIME_FORMATS = (
+    "%Y:%m:%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y%m%d_%H%M%S",
+    "%Y%m%d%H%M%S",
+    "%Y:%m:%d",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S",
+)
+_VALUE_FILL_RE = re.compile(r"[\d\s]+")
+_FORMAT_FILL_RE = re.compile(r"%[A-Za-z]|\s+")
+
+
+def _formats_by_separators(formats: Sequence[str]) -> dict[str, Tuple[str, ...]]:
+    """Group formats by their literal separators, ignoring digits and whitespace.
+
+    All directives above match digits (or padded digits), so a value can only
+    parse with formats whose separators equal its own non-digit characters.
+    """
+    grouped: dict[str, Tuple[str, ...]] = {}
+    for fmt in formats:
+        key = _FORMAT_FILL_RE.sub("", fmt)
+        grouped[key] = grouped.get(key, ()) + (fmt,)
+    return grouped
+
+
+_FORMATS_BY_SEPARATORS = _formats_by_separators(_DATETIME_FORMATS)
 
 
 def sha1_file(path: str, chunk_size: int = 1 << 20) -> str:
@@ -43,16 +70,9 @@ def safe_datetime_parse(value: str | None) -> datetime | None:
     if not value:
         return None
     value = value.strip().replace("\x00", "")
-    formats = [
-        "%Y:%m:%d %H:%M:%S",
-        "%Y-%m-%d %H:%M:%S",
-        "%Y%m%d_%H%M%S",
-        "%Y%m%d%H%M%S",
-        "%Y:%m:%d",
-        "%Y-%m-%d",
-        "%Y/%m/%d %H:%M:%S",
-    ]
-    for fmt in formats:
+    # Only try formats whose separators match, so junk strings cost one regex
+    # pass instead of a raised ValueError per format.
+    for fmt in _FORMATS_BY_SEPARATORS.get(_VALUE_FILL_RE.sub("", value), ()):
         try:
             return datetime.strptime(value, fmt)
         except ValueError:
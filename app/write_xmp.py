@@ -4,7 +4,11 @@ import shutil
 import subprocess
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from app.utils import chunked
+
+_BATCH_SIZE = 64
 
 
 def _ensure_exiftool() -> str:
@@ -14,18 +18,26 @@ def _ensure_exiftool() -> str:
     return exe
 
 
-def _write_single(exiftool_path: str, path: str, keywords: Iterable[str]):
-    keywords = list(dict.fromkeys([kw.strip() for kw in keywords if kw and kw.strip()]))
-    if not keywords:
+def _clean_keywords(keywords: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(text for text in (kw.strip() for kw in keywords if kw) if text))
+
+
+def _write_batch(exiftool_path: str, paths: Sequence[str], keywords: Sequence[str]):
+    """Write already-cleaned keywords to paths in one exiftool call."""
+    if not keywords or not paths:
         return
     cmd = [exiftool_path, "-overwrite_original"]
     for kw in keywords:
         cmd.append(f"-XMP-dc:Subject+={kw}")
         cmd.append(f"-IPTC:Keywords+={kw}")
-    cmd.append(path)
+    cmd.extend(paths)
     subprocess.run(cmd, check=True)
 
 
+def _write_single(exiftool_path: str, path: str, keywords: Iterable[str]):
+    _write_batch(exiftool_path, [path], _clean_keywords(keywords))
+
+
 def write_keywords(
     paths: List[str],
     keywords: List[List[str]],
@@ -34,9 +46,17 @@ def write_keywords(
     workers: int = 4,
 ):
     exiftool_path = _ensure_exiftool()
+    # Cluster writes share one keyword list across all members, so group paths by
+    # keywords and hand exiftool many files per process instead of one each.
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for path, kws in zip(paths, keywords):
+        cleaned = _clean_keywords(kws)
+        if cleaned:
+            groups.setdefault(cleaned, []).append(path)
     with ThreadPoolExecutor(max_workers=workers) as pool:
-        for path, kws in zip(paths, keywords):
-            pool.submit(_write_single, exiftool_path, path, kws)
+        for kws, group_paths in groups.items():
+            for batch in chunked(group_paths, _BATCH_SIZE):
+                pool.submit(_write_batch, exiftool_path, batch, kws)
 
 
 __all__ = ["write_keywords"]
@@ -5,8 +5,8 @@ import argparse
 from pathlib import Path
 
 import pandas as pd
-import yaml
 
+from app.config import load_config
 from app.jobs import Pipeline
 
 
@@ -16,7 +16,7 @@ def main():
     parser.add_argument("--openai", action="store_true", help="Enable OpenAI Vision for medoids")
     args = parser.parse_args()
 
-    cfg = yaml.safe_load(Path(args.config).read_text("utf-8"))
+    cfg = load_config(args.config)
     pipeline = Pipeline(cfg)
 
     required = {
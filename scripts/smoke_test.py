@@ -13,9 +13,9 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
-import yaml
 from PIL import Image
 
+from app.config import load_config
 from app.jobs import Pipeline
 
 
@@ -46,11 +46,6 @@ def make_argparser() -> argparse.ArgumentParser:
     return ap
 
 
-def load_config(path: Path) -> dict:
-    with open(path, "r", encoding="utf-8") as fh:
-        return yaml.safe_load(fh)
-
-
 def create_synthetic_images(root: Path, count: int) -> list[Path]:
     root.mkdir(parents=True, exist_ok=True)
     paths: list[Path] = []
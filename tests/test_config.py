@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from app import config
+
+
+def test_load_config_reuses_parse_until_file_changes(tmp_path, monkeypatch):
+    target = tmp_path / "config.yaml"
+    target.write_text("runtime:\n  workers: 2\n", encoding="utf-8")
+
+    calls = []
+    real_load = config.yaml.load
+
+    def counting_load(fh, Loader):
+        calls.append(fh.name)
+        return real_load(fh, Loader=Loader)
+
+    monkeypatch.setattr(config.yaml, "load", counting_load)
+
+    first = config.load_config(target)
+    second = config.load_config(str(target))
+    assert first == second == {"runtime": {"workers": 2}}
+    assert len(calls) == 1
+
+    target.write_text("runtime:\n  workers: 16\n", encoding="utf-8")
+    st = target.stat()
+    os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert config.load_config(target) == {"runtime": {"workers": 16}}
+    assert len(calls) == 2
+
+
+def test_load_config_returns_independent_copies(tmp_path):
+    target = tmp_path / "config.yaml"
+    target.write_text("people_policy:\n  allow_openai_on_people_sets: false\n", encoding="utf-8")
+
+    cfg = config.load_config(target)
+    cfg["people_policy"]["allow_openai_on_people_sets"] = True
+    cfg.setdefault("review", {})["default_apply_to_cluster"] = False
+
+    fresh = config.load_config(target)
+    assert fresh == {"people_policy": {"allow_openai_on_people_sets": False}}
+
+
+def test_load_config_uses_safe_loader(tmp_path):
+    target = tmp_path / "config.yaml"
+    target.write_text("payload: !!python/object/apply:os.getcwd []\n", encoding="utf-8")
+
+    with pytest.raises(config.yaml.YAMLError):
+        config.load_config(target)
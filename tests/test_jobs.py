@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.jobs import Pipeline
+
+_OLD_MTIME_NS = 1_600_000_000_000_000_000
+
+
+def _pipeline_with_tags(tmp_path):
+    pipeline = Pipeline({"runtime": {"cache_root": str(tmp_path)}})
+    seed = pd.DataFrame(
+        [
+            {
+                "cluster_id": 1,
+                "medoid_id": 10,
+                "ck_tags": ["CK:sun"],
+                "ai_tags": ["AI:sky"],
+                "apply_cluster": True,
+                "selected": False,
+            },
+            {
+                "cluster_id": 2,
+                "medoid_id": 20,
+                "ck_tags": ["CK:tree"],
+                "ai_tags": [],
+                "apply_cluster": True,
+                "selected": False,
+            },
+        ]
+    )
+    pipeline._write_parquet(seed, pipeline.medoid_ai_path)  # pylint: disable=protected-access
+    os.utime(pipeline.medoid_ai_path, ns=(_OLD_MTIME_NS, _OLD_MTIME_NS))
+    return pipeline
+
+
+def _review_row(cluster_id, ck_tags, ai_tags, apply_cluster=True, selected=False):
+    return {
+        "cluster_id": cluster_id,
+        "ck_tags": ck_tags,
+        "ai_tags": ai_tags,
+        "apply_cluster": apply_cluster,
+        "selected": selected,
+    }
+
+
+def test_update_medoid_tags_stores_list_cells_as_individual_tags(tmp_path):
+    pipeline = _pipeline_with_tags(tmp_path)
+    review = pd.DataFrame(
+        [
+            _review_row(1, ["CK:sun", "beach", "CK:sun"], np.array(["AI:sky", "AI:sea"])),
+            _review_row(2, np.array(["CK:tree", "CK:leaf"]), ["cloud"]),
+        ]
+    )
+
+    pipeline.update_medoid_tags(review)
+
+    stored = pd.read_parquet(pipeline.medoid_ai_path).set_index("cluster_id")
+    assert list(stored.at[1, "ck_tags"]) == ["CK:sun", "CK:beach"]
+    assert list(stored.at[1, "ai_tags"]) == ["AI:sky", "AI:sea"]
+    assert list(stored.at[2, "ck_tags"]) == ["CK:tree", "CK:leaf"]
+    assert list(stored.at[2, "ai_tags"]) == ["AI:cloud"]
+
+
+def test_update_medoid_tags_skips_write_when_nothing_changed(tmp_path):
+    pipeline = _pipeline_with_tags(tmp_path)
+    review = pd.DataFrame(
+        [
+            _review_row(1, ["CK:sun"], ["AI:sky"]),
+            _review_row(2, ["CK:tree"], []),
+        ]
+    )
+
+    pipeline.update_medoid_tags(review)
+
+    assert os.stat(pipeline.medoid_ai_path).st_mtime_ns == _OLD_MTIME_NS
+
+
+def test_update_medoid_tags_writes_when_scope_or_selection_changes(tmp_path):
+    for changes in ({"apply_cluster": False}, {"selected": True}):
+        pipeline = _pipeline_with_tags(tmp_path)
+        review = pd.DataFrame(
+            [
+                _review_row(1, ["CK:sun"], ["AI:sky"], **changes),
+                _review_row(2, ["CK:tree"], []),
+            ]
+        )
+
+        pipeline.update_medoid_tags(review)
+
+        assert os.stat(pipeline.medoid_ai_path).st_mtime_ns != _OLD_MTIME_NS
+        stored = pd.read_parquet(pipeline.medoid_ai_path).set_index("cluster_id")
+        for column, value in changes.items():
+            assert bool(stored.at[1, column]) is value
@@ -61,3 +61,33 @@ def test_resolve_datetime_returns_none_when_no_signals():
     assert resolved is None
     assert trust == 0.0
     assert used == []
+
+
+def test_crawl_walks_nested_dirs_and_reuses_entry_stat(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.jpg").write_bytes(b"aaaa")
+    (tmp_path / "sub" / "b.JPG").write_bytes(b"bb")
+    (tmp_path / "notes.txt").write_text("skip", encoding="utf-8")
+    (tmp_path / "._a.jpg").write_bytes(b"resource fork")
+
+    rows = scanner.crawl([str(tmp_path)], [".jpg"], ["^\\._"])
+
+    assert [row["path"] for row in rows] == [str(tmp_path / "a.jpg"), str(tmp_path / "sub" / "b.JPG")]
+    assert [row["bytes"] for row in rows] == [4, 2]
+    assert [row["id"] for row in rows] == [0, 1]
+
+
+def test_crawl_skips_missing_roots(tmp_path):
+    assert scanner.crawl([str(tmp_path / "missing")], [".jpg"], []) == []
+
+
+def test_crawl_with_workers_keeps_walk_order_and_ids(tmp_path):
+    for idx in range(6):
+        (tmp_path / f"img{idx}.jpg").write_bytes(b"x" * (idx + 1))
+
+    serial = scanner.crawl([str(tmp_path)], [".jpg"], [])
+    threaded = scanner.crawl([str(tmp_path)], [".jpg"], [], workers=3)
+
+    assert [(row["id"], row["path"], row["sha1"]) for row in threaded] == [
+        (row["id"], row["path"], row["sha1"]) for row in serial
+    ]
@@ -31,6 +31,21 @@ def test_safe_datetime_parse_accepts_common_formats():
     assert parsed.year == 2021 and parsed.month == 12 and parsed.day == 31
 
 
+def test_safe_datetime_parse_matches_each_supported_separator_layout():
+    expected = datetime(2021, 12, 31, 23, 59, 59)
+    for raw in (
+        "2021:12:31 23:59:59",
+        "2021-12-31 23:59:59",
+        "20211231_235959",
+        "20211231235959",
+        "2021/12/31  23:59:59",
+    ):
+        assert utils.safe_datetime_parse(raw) == expected
+    assert utils.safe_datetime_parse("2021:12:31") == datetime(2021, 12, 31)
+    assert utils.safe_datetime_parse("2021-1-5") == datetime(2021, 1, 5)
+    assert utils.safe_datetime_parse("2021-12-31T23:59:59") is None
+
+
 def test_safe_datetime_parse_returns_none_for_invalid():
     assert utils.safe_datetime_parse("not a date") is None
     assert utils.safe_datetime_parse("") is None
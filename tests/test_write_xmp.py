@@ -71,6 +71,51 @@ def test_write_keywords_uses_exiftool(monkeypatch):
     assert len(calls) == 1
 
 
+def test_write_keywords_batches_paths_sharing_keywords(monkeypatch):
+    calls = []
+
+    monkeypatch.setattr(write_xmp.shutil, "which", lambda name: "/usr/bin/exiftool")
+    monkeypatch.setattr(write_xmp.subprocess, "run", lambda cmd, check: calls.append(cmd))
+
+    class SyncExecutor:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def submit(self, fn, *args, **kwargs):
+            fn(*args, **kwargs)
+
+    monkeypatch.setattr(write_xmp, "ThreadPoolExecutor", SyncExecutor)
+
+    paths = ["/tmp/a.jpg", "/tmp/b.jpg", "/tmp/c.jpg"]
+    keywords = [["CK:one"], ["AI:two"], [" CK:one "]]
+
+    write_xmp.write_keywords(paths, keywords, prefix_ck="CK:", prefix_ai="AI:")
+
+    assert calls == [
+        [
+            "/usr/bin/exiftool",
+            "-overwrite_original",
+            "-XMP-dc:Subject+=CK:one",
+            "-IPTC:Keywords+=CK:one",
+            "/tmp/a.jpg",
+            "/tmp/c.jpg",
+        ],
+        [
+            "/usr/bin/exiftool",
+            "-overwrite_original",
+            "-XMP-dc:Subject+=AI:two",
+            "-IPTC:Keywords+=AI:two",
+            "/tmp/b.jpg",
+        ],
+    ]
+
+
 def test_write_keywords_raises_when_exiftool_missing(monkeypatch):
     monkeypatch.setattr(write_xmp.shutil, "which", lambda name: None)
     with pytest.raises(RuntimeError):